@@ -3,37 +3,45 @@ FastAPI app for JVAI Policy Chatbot.
 Applies SOLID principles for clean design.
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Form, BackgroundTasks
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+from dataclasses import dataclass, asdict
+from functools import lru_cache
 from pathlib import Path
-import shutil
+from uuid import uuid4
+import asyncio
+import threading
+import aiofiles
 
 # Domain services
 from .config import settings
-from .ingest import read_pdf_with_pages, build_corpus, embed_corpus, save_index_and_store
+from .ingest import (
+    build_corpus_from_pdf, embed_corpus, save_index_and_store,
+    index_fingerprint, index_is_current, read_manifest, can_append, write_manifest,
+)
 from .retriever import Retriever
 from .memory import ConversationMemory
-from .llm import call_llm
+from .llm import call_llm_async, close_async_client, SemanticLLMCache, response_cache
 
 
 
 
 class AnswerGenerator:
     """Abstract answer generator interface."""
-    def generate(self, question: str, results: list[dict]) -> str:
+    async def generate(self, question: str, results: list[dict]) -> str:
         raise NotImplementedError
 
 
 class ExtractiveAnswerGenerator(AnswerGenerator):
     """Returns raw snippets with page numbers (default)."""
-    def generate(self, question: str, results: list[dict]) -> str:
+    async def generate(self, question: str, results: list[dict]) -> str:
         if not results:
             return "No relevant information found in the document."
         lines = [f"Q: {question}", "", "Top matches:"]
         for r in results:
-            snippet = r["text"].strip().replace("\n", " ")
+            snippet = r["text"]
             if len(snippet) > 300:
                 snippet = snippet[:300] + "…"
             lines.append(f"- (page {r['page']}, score {r['score']:.3f}) {snippet}")
@@ -42,8 +50,11 @@ class ExtractiveAnswerGenerator(AnswerGenerator):
 
 class LLMAnswerGenerator(AnswerGenerator):
     """Uses an LLM to summarize retrieved results into a natural answer."""
-    def generate(self, question: str, results: list[dict]) -> str:
-        return call_llm(question, results)
+    def __init__(self, sem_cache: SemanticLLMCache | None = None):
+        self.sem_cache = sem_cache
+
+    async def generate(self, question: str, results: list[dict]) -> str:
+        return await call_llm_async(question, results, self.sem_cache)
 
 
 
@@ -53,9 +64,39 @@ class LLMAnswerGenerator(AnswerGenerator):
 app = FastAPI(title="JVAI Policy Chatbot")
 templates = Jinja2Templates(directory="templates")
 
+
+@lru_cache(maxsize=1)
+def _index_template():
+    # Resolved once, on first use (the templates dir is optional for API-only use)
+    return templates.get_template("index.html")
+
 # Conversation memory (per-session)
 memory = ConversationMemory()
 retriever: Retriever | None = None
+sem_cache: SemanticLLMCache | None = None
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class JobState:
+    status: str = "pending"  # pending | done | error
+    chunks: int | None = None
+    cached: bool = False
+    error: str | None = None
+
+
+# Background ingest jobs, by id (in-process; lost on restart)
+jobs: dict[str, JobState] = {}
+# Finished jobs kept around for polling; older ones are dropped as new jobs start
+MAX_FINISHED_JOBS = 100
+# One ingest at a time: they all write the same index files
+ingest_lock = threading.Lock()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_async_client()
 
 
 
@@ -64,6 +105,7 @@ retriever: Retriever | None = None
 
 class IngestReq(BaseModel):
     pdf_path: str
+    replace: bool = True  # False: add to the existing index
 
 
 class AskReq(BaseModel):
@@ -74,13 +116,93 @@ class AskReq(BaseModel):
 
 
 
+def _refresh_retriever(index_changed: bool = True) -> None:
+    """Point the retriever at the index on disk, reusing the loaded model."""
+    global retriever, sem_cache
+    if index_changed:
+        # Cached answers refer to the previous index. Retire the old cache before
+        # the new index is visible, so no request pairs new snippets with an old
+        # answer or writes one into the new log, then drop its log.
+        if sem_cache is not None:
+            sem_cache.close()
+        settings.sem_cache_path.unlink(missing_ok=True)
+    if retriever is None:
+        retriever = Retriever()
+    elif index_changed:
+        retriever.reload()
+    if sem_cache is None or index_changed:
+        # Built from the (now empty) log before being published
+        sem_cache = SemanticLLMCache(retriever.model)
+
+
+def _ingest_pdf(pdf_path: Path, replace: bool = True) -> tuple[int, bool]:
+    """
+    Run the ingestion pipeline (blocking) and swap in the new index.
+    replace=False appends the PDF to the existing index instead.
+    Returns (number of chunks, whether the existing index was reused).
+    """
+    with ingest_lock:
+        return _ingest_pdf_locked(pdf_path, replace)
+
+
+def _ingest_pdf_locked(pdf_path: Path, replace: bool) -> tuple[int, bool]:
+    fingerprint = index_fingerprint(pdf_path, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, settings.MODEL_NAME)
+    if index_is_current(fingerprint, settings.manifest_path, settings.index_path, settings.store_path, replace):
+        _refresh_retriever(index_changed=False)
+        return len(retriever.store), True
+
+    corpus = build_corpus_from_pdf(pdf_path, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    if not corpus:
+        raise HTTPException(status_code=400, detail="No extractable text in the PDF.")
+
+    embeddings = embed_corpus(corpus, settings.MODEL_NAME)
+    docs = [] if replace else read_manifest(settings.manifest_path)
+    if not can_append(fingerprint, docs):
+        replace, docs = True, []
+    settings.manifest_path.unlink(missing_ok=True)  # stale until the new index is fully written
+    save_index_and_store(embeddings, corpus, settings.index_path, settings.store_path, replace=replace)
+
+    write_manifest(docs + [fingerprint], settings.manifest_path)
+    _refresh_retriever()
+    return len(corpus), False
+
+
+def _run_ingest_job(job_id: str, pdf_path: Path, replace: bool) -> None:
+    """Background task: run the pipeline and record the outcome on the job."""
+    job = jobs[job_id]
+    try:
+        job.chunks, job.cached = _ingest_pdf(pdf_path, replace)
+        job.status = "done"
+    except HTTPException as e:
+        job.status, job.error = "error", e.detail
+    except Exception as e:
+        job.status, job.error = "error", str(e)
+
+
+def _trim_jobs() -> None:
+    finished = [job_id for job_id, job in list(jobs.items()) if job.status != "pending"]
+    for job_id in finished[:-MAX_FINISHED_JOBS]:
+        jobs.pop(job_id, None)
+
+
+def _start_ingest_job(background_tasks: BackgroundTasks, pdf_path: Path, replace: bool) -> str:
+    _trim_jobs()
+    job_id = uuid4().hex
+    jobs[job_id] = JobState()
+    background_tasks.add_task(_run_ingest_job, job_id, pdf_path, replace)
+    return job_id
+
+
+
 # Endpoints
 
 
 @app.post("/upload_pdf")
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...), replace: bool = True):
     """
-    Accept a PDF upload, save it to data/, and build the FAISS index.
+    Accept a PDF upload, save it to data/, and build the FAISS index in the background.
+    ?replace=false adds the PDF to the existing index instead of replacing it.
+    Poll GET /jobs/{job_id} for the result.
     """
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
@@ -88,49 +210,52 @@ async def upload_pdf(file: UploadFile = File(...)):
     save_path = Path(settings.DATA_DIR) / file.filename
     save_path.parent.mkdir(exist_ok=True, parents=True)
 
-    with save_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Run ingestion pipeline
-    pages = read_pdf_with_pages(save_path)
-    if not pages:
-        raise HTTPException(status_code=400, detail="No extractable text in PDF.")
-
-    corpus = build_corpus(pages, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
-    embeddings = embed_corpus(corpus, settings.MODEL_NAME)
-    save_index_and_store(embeddings, corpus, settings.index_path, settings.store_path)
-
-    global retriever
-    retriever = Retriever()
+    # Stream to disk in 1 MiB pieces without blocking the event loop
+    async with aiofiles.open(save_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
 
-    return {"message": "PDF uploaded and ingested successfully!", "chunks": len(corpus)}
+    # Ingestion runs after the response is sent, in Starlette's threadpool
+    job_id = _start_ingest_job(background_tasks, save_path, replace)
+    return {"message": "PDF uploaded, ingestion started.", "job_id": job_id, "status": "pending"}
 
 
 @app.post("/ingest")
-def ingest(req: IngestReq):
+def ingest(req: IngestReq, background_tasks: BackgroundTasks):
     """
-    Ingest a PDF from a given path (server-side).
+    Ingest a PDF from a given path (server-side), in the background.
+    Poll GET /jobs/{job_id} for the result.
     """
     pdf = Path(req.pdf_path)
     if not pdf.exists():
         raise HTTPException(status_code=400, detail=f"PDF not found: {pdf}")
 
-    pages = read_pdf_with_pages(pdf)
-    if not pages:
-        raise HTTPException(status_code=400, detail="No extractable text in the PDF.")
+    job_id = _start_ingest_job(background_tasks, pdf, req.replace)
+    return {"job_id": job_id, "status": "pending", "index_path": str(settings.index_path), "store_path": str(settings.store_path)}
 
-    corpus = build_corpus(pages, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
-    embeddings = embed_corpus(corpus, settings.MODEL_NAME)
-    save_index_and_store(embeddings, corpus, settings.index_path, settings.store_path)
 
-    global retriever
-    retriever = Retriever()
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """
+    Status of a background ingest job: pending, done (with chunk count) or error.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return {"job_id": job_id, **asdict(job)}
+
 
-    return {"chunks": len(corpus), "index_path": str(settings.index_path), "store_path": str(settings.store_path)}
+@app.get("/stats")
+def stats():
+    """
+    LLM answer cache counters for this worker: exact hits, semantic-cache hits,
+    misses (calls that went to the LLM) and in-memory entries.
+    """
+    return {"llm_cache": response_cache.stats()}
 
 
 @app.post("/ask")
-def ask(req: AskReq):
+async def ask(req: AskReq):
     """
     Ask a question via API.
     Supports both extractive (default) and LLM summarization.
@@ -141,13 +266,14 @@ def ask(req: AskReq):
 
     # Contextualize question with memory
     q_ctx = memory.contextualize(req.session_id, req.question)
-    results = retriever.search(q_ctx, top_k=req.top_k or settings.TOP_K)
+    # Query encoding is CPU-bound, keep it off the event loop
+    results = await asyncio.to_thread(retriever.search, q_ctx, req.top_k or settings.TOP_K)
     topic = memory.infer_topic(req.question)
     memory.update(req.session_id, req.question, topic)
 
     # Choose answer generator
-    generator: AnswerGenerator = LLMAnswerGenerator() if req.use_llm else ExtractiveAnswerGenerator()
-    answer = generator.generate(req.question, results)
+    generator: AnswerGenerator = LLMAnswerGenerator(sem_cache) if req.use_llm else ExtractiveAnswerGenerator()
+    answer = await generator.generate(req.question, results)
 
     return {"answer": answer, "results": results}
 
@@ -156,7 +282,7 @@ def ask(req: AskReq):
 
 
 @app.post("/ask_ui", response_class=HTMLResponse)
-def ask_ui(request: Request, question: str = Form(...), use_llm: str = Form(None)):
+async def ask_ui(request: Request, question: str = Form(...), use_llm: str = Form(None)):
     """
     Handle UI form submission for questions.
     """
@@ -165,15 +291,15 @@ def ask_ui(request: Request, question: str = Form(...), use_llm: str = Form(None
         raise HTTPException(status_code=400, detail="Index not found. Upload a PDF first.")
 
     q_ctx = memory.contextualize("ui", question)
-    results = retriever.search(q_ctx, settings.TOP_K)
+    results = await asyncio.to_thread(retriever.search, q_ctx, settings.TOP_K)
     topic = memory.infer_topic(question)
     memory.update("ui", question, topic)
 
-    generator: AnswerGenerator = LLMAnswerGenerator() if use_llm else ExtractiveAnswerGenerator()
-    answer = generator.generate(question, results)
+    generator: AnswerGenerator = LLMAnswerGenerator(sem_cache) if use_llm else ExtractiveAnswerGenerator()
+    answer = await generator.generate(question, results)
 
-    return templates.TemplateResponse("index.html", {
+    return HTMLResponse(_index_template().render({
         "request": request,
         "answer": answer,
         "results": results
-    })
+    }))
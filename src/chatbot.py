@@ -1,12 +1,13 @@
 from .retriever import Retriever
 from .memory import ConversationMemory
-from .llm import call_llm   # new import
+from .llm import call_llm, SemanticLLMCache
 
 
 class Chatbot:
     def __init__(self):
         self.retriever = Retriever()
         self.memory = ConversationMemory()
+        self.sem_cache = SemanticLLMCache(self.retriever.model)
 
     def answer(self, session_id: str, question: str, top_k: int = 3, use_llm: bool = False) -> str:
         q_ctx = self.memory.contextualize(session_id, question)
@@ -19,14 +20,14 @@ class Chatbot:
 
         if use_llm:
             # ✅ Summarized answer
-            summary = call_llm(question, results)
+            summary = call_llm(question, results, self.sem_cache)
             return f"Q: {question}\n\n{summary}\n\n---\nSources:\n" + \
                    "\n".join([f"- Page {r['page']}, score {r['score']:.3f}" for r in results])
         else:
             # ✅ Extractive fallback (default)
             lines = [f"Q: {question}", "", "Top matches:"]
             for r in results:
-                snippet = r["text"].strip().replace("\n", " ")
+                snippet = r["text"]
                 if len(snippet) > 400:
                     snippet = snippet[:400] + "…"
                 lines.append(f"- (page {r['page']}, score {r['score']:.3f}) {snippet}")
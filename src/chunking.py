@@ -0,0 +1,118 @@
+"""
+PDF text extraction and chunking.
+
+Kept free of the model/index stack (torch, faiss, sentence-transformers) so the
+worker processes that build_corpus_from_pdf starts import it in a fraction of a second.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict
+
+import numpy as np
+import pypdfium2 as pdfium
+
+
+def _read_page_range(pdf_path: Path, start: int = 0, stop: int | None = None) -> List[Dict]:
+    """Extract pages [start, stop) as dicts: {page, text} (1-based page numbers)."""
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    pages = []
+    try:
+        for i in range(start, len(pdf) if stop is None else stop):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            textpage.close()
+            page.close()
+            text = text.replace("\r\n", "\n").replace("\x00", "").strip()
+            if text:
+                pages.append({"page": i + 1, "text": text})
+    finally:
+        pdf.close()
+    return pages
+
+
+def read_pdf_with_pages(pdf_path: Path) -> List[Dict]:
+    """Read PDF and return list of dicts: {page, text}"""
+    return _read_page_range(pdf_path)
+
+
+def chunk_offsets(n: int, chunk_size: int, overlap: int) -> tuple[np.ndarray, np.ndarray]:
+    """Start/end offsets of overlapping chunks over a text of length n."""
+    step = chunk_size - overlap
+    if step <= 0:
+        raise ValueError("chunk_size must be larger than overlap.")
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # A chunk starting at or after n - overlap would only repeat the previous chunk's tail
+    starts = np.arange(0, max(n - overlap, 1), step)
+    ends = np.minimum(starts + chunk_size, n)
+    return starts, ends
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """Split text into overlapping character chunks."""
+    starts, ends = chunk_offsets(len(text), chunk_size, overlap)
+    # Substrings are only materialized here, once the offsets are known
+    return [text[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+
+
+def build_corpus(pages: List[Dict], chunk_size: int, overlap: int) -> List[Dict]:
+    """
+    Create a list of chunk dicts with page numbers.
+    "text_clean" has whitespace collapsed to single spaces, ready for display/prompts.
+    """
+    return [
+        {"page": p["page"], "chunk_id": f"p{p['page']}_c{idx}", "text": ch.strip(), "text_clean": " ".join(ch.split())}
+        for p in pages
+        for idx, ch in enumerate(chunk_text(p["text"], chunk_size, overlap))
+    ]
+
+
+# Pages handed to a worker at once (each worker task opens the PDF once)
+PAGES_PER_TASK = 8
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 32
+
+
+def _chunk_page_range(pdf_path: Path, start: int, stop: int, chunk_size: int, overlap: int) -> List[Dict]:
+    # Chunk inside the worker so only the final chunk dicts are pickled back
+    return build_corpus(_read_page_range(pdf_path, start, stop), chunk_size, overlap)
+
+
+def build_corpus_from_pdf(pdf_path: Path, chunk_size: int, overlap: int, jobs: int | None = None) -> List[Dict]:
+    """
+    Extract + chunk a PDF, spreading page ranges over worker processes.
+    Same result as build_corpus(read_pdf_with_pages(pdf_path), ...), with each
+    chunk tagged "doc_id" = the PDF's file name.
+    """
+    corpus = _build_corpus_from_pdf(pdf_path, chunk_size, overlap, jobs)
+    for c in corpus:
+        c["doc_id"] = pdf_path.name
+    return corpus
+
+
+def _build_corpus_from_pdf(pdf_path: Path, chunk_size: int, overlap: int, jobs: int | None) -> List[Dict]:
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    n_pages = len(pdf)
+    pdf.close()
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or n_pages < PARALLEL_MIN_PAGES:
+        return _chunk_page_range(pdf_path, 0, n_pages, chunk_size, overlap)
+
+    starts = list(range(0, n_pages, PAGES_PER_TASK))
+    stops = [min(s + PAGES_PER_TASK, n_pages) for s in starts]
+    # Not fork: this runs in the server's threadpool, and forking a process with
+    # live threads (torch, faiss, httpx) can deadlock the children.
+    # Windows has no forkserver; spawn is safe too, just slower to start.
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    mp_context = multiprocessing.get_context(start_method)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(starts)), mp_context=mp_context) as ex:
+        parts = ex.map(
+            _chunk_page_range,
+            [pdf_path] * len(starts), starts, stops,
+            [chunk_size] * len(starts), [overlap] * len(starts),
+        )
+        return [chunk for part in parts for chunk in part]
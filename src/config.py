@@ -12,6 +12,11 @@ class Settings(BaseModel):
     INDEX_DIR: str = os.getenv("INDEX_DIR", "models")
     DATA_DIR: str = os.getenv("DATA_DIR", "data")
     MODEL_NAME: str = os.getenv("MODEL_NAME", "all-MiniLM-L6-v2")
+    EMBED_INT8: bool = os.getenv("EMBED_INT8", "1") == "1"
+    INDEX_PRECISION: str = os.getenv("INDEX_PRECISION", "fp16")  # fp32 | fp16 | int8
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", 512))
+    LLM_DISK_CACHE: bool = os.getenv("LLM_DISK_CACHE", "1") == "1"
+    SEM_CACHE_THRESHOLD: float = float(os.getenv("SEM_CACHE_THRESHOLD", 0.92))
 
     @property
     def index_path(self) -> Path:
@@ -21,4 +26,12 @@ class Settings(BaseModel):
     def store_path(self) -> Path:
         return Path(self.INDEX_DIR) / "store.json"
 
+    @property
+    def manifest_path(self) -> Path:
+        return Path(self.INDEX_DIR) / "manifest.json"
+
+    @property
+    def sem_cache_path(self) -> Path:
+        return Path(self.INDEX_DIR) / "llm_sem_cache.jsonl"
+
 settings = Settings()
\ No newline at end of file
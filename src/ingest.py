@@ -7,76 +7,183 @@ Why:
 - FAISS gives fast local vector search.
 """
 import argparse
+import hashlib
 import json
+import math
+import os
 from pathlib import Path
 from typing import List, Dict
 
 import numpy as np
-from pypdf import PdfReader
-from sentence_transformers import SentenceTransformer
 import faiss
+import torch
+from tqdm import tqdm
 
+from .chunking import build_corpus_from_pdf
 from .config import settings
-
-
-def read_pdf_with_pages(pdf_path: Path) -> List[Dict]:
-    """Read PDF and return list of dicts: {page, text}"""
-    reader = PdfReader(str(pdf_path))
-    pages = []
-    for i, page in enumerate(reader.pages, start=1):
-        text = page.extract_text() or ""
-        text = text.replace("\x00", "").strip()
-        if text:
-            pages.append({"page": i, "text": text})
-    return pages
-
-
-def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
-    """Split text into overlapping character chunks."""
-    chunks = []
-    start = 0
-    n = len(text)
-    while start < n:
-        end = min(start + chunk_size, n)
-        chunk = text[start:end]
-        chunks.append(chunk)
-        if end == n:
-            break
-        start = end - overlap
-        if start < 0:
-            start = 0
-    return chunks
-
-
-def build_corpus(pages: List[Dict], chunk_size: int, overlap: int) -> List[Dict]:
-    """Create a list of chunk dicts with page numbers."""
-    corpus = []
-    for p in pages:
-        chunks = chunk_text(p["text"], chunk_size, overlap)
-        for idx, ch in enumerate(chunks):
-            corpus.append({
-                "page": p["page"],
-                "chunk_id": f"p{p['page']}_c{idx}",
-                "text": ch.strip()
-            })
-    return corpus
+from .models import get_model, embed_precision
+from .store import store_writers, read_header, replace_file, replace_files, STORE_FORMAT
 
 
 def embed_corpus(corpus: List[Dict], model_name: str) -> np.ndarray:
-    model = SentenceTransformer(model_name)
+    model = get_model(model_name)
+    on_gpu = model.device.type == "cuda"
+    if not on_gpu:
+        torch.set_num_threads(os.cpu_count())
+
     texts = [c["text"] for c in corpus]
-    embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=True, normalize_embeddings=True)
+    batch_size = 256 if on_gpu else 64
+    embeddings = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    if not texts:
+        return embeddings
+
+    # Length bins: each bin is one batch of similar-length texts, so little padding is wasted
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    bins = np.array_split(order, math.ceil(len(texts) / batch_size))
+    for idx in tqdm(bins, desc="Embedding"):
+        embeddings[idx] = model.encode(
+            [texts[i] for i in idx],
+            batch_size=len(idx),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
     return embeddings
 
 
-def save_index_and_store(embeddings: np.ndarray, corpus: List[Dict], index_path: Path, store_path: Path) -> None:
-    index = faiss.IndexFlatIP(embeddings.shape[1])
-    index.add(embeddings.astype(np.float32))
-    index_path.parent.mkdir(parents=True, exist_ok=True)
-    faiss.write_index(index, str(index_path))
+# Corpus sizes (in chunks) above which exact search gives way to approximate indexes
+FLAT_MAX_CHUNKS = 5_000
+HNSW_MAX_CHUNKS = 100_000
+
+
+# Stored vector precision for the flat/HNSW indexes (IVF-PQ is compressed anyway)
+SQ_TYPES = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+
+
+def build_index(embeddings: np.ndarray, precision: str = None) -> tuple[faiss.Index, Dict]:
+    """
+    Pick an inner-product index for the corpus size.
+    Returns the filled index and the search-time parameters to apply when loading it.
+    """
+    precision = precision or settings.INDEX_PRECISION
+    n, d = embeddings.shape
+    # Normalized embeddings lose next to no recall at fp16/int8 and the scan is
+    # memory-bound, so halving (or quartering) the bytes per vector speeds it up
+    sq_type = SQ_TYPES.get(precision)
+    if n < FLAT_MAX_CHUNKS:
+        # Exact scan is fast enough and has perfect recall
+        if sq_type is None:
+            index = faiss.IndexFlatIP(d)
+        else:
+            index = faiss.IndexScalarQuantizer(d, sq_type, faiss.METRIC_INNER_PRODUCT)
+        search_params = {}
+    elif n <= HNSW_MAX_CHUNKS:
+        if sq_type is None:
+            index = faiss.IndexHNSWFlat(d, 32, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(d, sq_type, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+        search_params = {"efSearch": 64}
+    else:
+        # PQ needs the vector split into equal sub-vectors
+        m = next(m for m in (48, 32, 16, 8, 4, 2, 1) if d % m == 0)
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFPQ(quantizer, d, 1024, m, 8, faiss.METRIC_INNER_PRODUCT)
+        search_params = {"nprobe": 16}
+    if not index.is_trained:
+        # PQ codebooks / int8 value ranges
+        index.train(embeddings)
+    index.add(embeddings)
+    return index, search_params
+
+
+def save_index_and_store(
+    embeddings: np.ndarray, corpus: List[Dict], index_path: Path, store_path: Path, replace: bool = True
+) -> None:
+    """
+    Write the index and store for `corpus`.
+    With replace=False the chunks are appended to the existing index (only the new
+    embeddings are added) as long as its dimension matches; otherwise it is rebuilt.
+    """
+    embeddings = embeddings.astype(np.float32)
+    append = False
+    if not replace and index_path.exists() and store_path.exists():
+        index = faiss.read_index(str(index_path))
+        append = index.d == embeddings.shape[1]
+    if append:
+        # The index type stays what it was built as, even if the corpus outgrows it
+        index.add(embeddings)
+        search_params = read_header(store_path).get("search_params", {})
+    else:
+        index, search_params = build_index(embeddings)
 
-    with store_path.open("w", encoding="utf-8") as f:
-        json.dump({"corpus": corpus}, f, ensure_ascii=False, indent=2)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    # Index and store are staged together: if any write fails (say, reading the
+    # store to append to it), neither is touched and they stay the same size
+    writes = store_writers(corpus, store_path, search_params, append=append)
+    writes[index_path] = lambda p: faiss.write_index(index, str(p))
+    replace_files(writes)
+
+
+def file_digest(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.blake2b()
+    with path.open("rb") as f:
+        while block := f.read(block_size):
+            h.update(block)
+    return h.hexdigest()
+
+
+def index_fingerprint(pdf_path: Path, chunk_size: int, overlap: int, model_name: str) -> Dict:
+    """Everything the built index depends on; a change in any field means re-ingest."""
+    return {
+        # doc_id as tagged on the chunks by build_corpus_from_pdf
+        "doc_id": pdf_path.name,
+        "pdf_hash": file_digest(pdf_path), "chunk_size": chunk_size, "overlap": overlap, "model": model_name,
+        "embed_precision": embed_precision(), "index_precision": settings.INDEX_PRECISION,
+        "store_format": STORE_FORMAT,
+    }
+
+
+# Fingerprint fields every document in one index must share (the rest is per PDF)
+INDEX_WIDE_FIELDS = ("model", "embed_precision", "index_precision", "store_format")
+
+
+def read_manifest(manifest_path: Path) -> List[Dict]:
+    """Fingerprints of the documents in the current index."""
+    if not manifest_path.exists():
+        return []
+    with manifest_path.open("r", encoding="utf-8") as f:
+        return json.load(f).get("docs", [])
+
+
+def index_is_current(
+    fingerprint: Dict, manifest_path: Path, index_path: Path, store_path: Path, replace: bool = True
+) -> bool:
+    """
+    Whether the index on disk already is what ingesting this PDF would produce:
+    exactly this PDF (replace) or any index containing it (append).
+    """
+    if not (index_path.exists() and store_path.exists()):
+        return False
+    docs = read_manifest(manifest_path)
+    return docs == [fingerprint] if replace else fingerprint in docs
+
+
+def can_append(fingerprint: Dict, docs: List[Dict]) -> bool:
+    """
+    New chunks can join an index only if it was embedded/stored the same way.
+    An index without a manifest (e.g. built before it existed) is of unknown make: rebuild.
+    So is one already holding another version of this PDF: both would carry the same
+    doc_id, and the old chunks would stay searchable.
+    """
+    return (
+        bool(docs)
+        and all(d.get(f) == fingerprint[f] for d in docs for f in INDEX_WIDE_FIELDS)
+        and all(d.get("doc_id") != fingerprint["doc_id"] for d in docs)
+    )
+
+
+def write_manifest(docs: List[Dict], manifest_path: Path) -> None:
+    replace_file(manifest_path, lambda p: p.write_text(json.dumps({"docs": docs}, indent=2), encoding="utf-8"))
 
 
 def main():
@@ -86,20 +193,29 @@ def main():
     parser.add_argument("--overlap", type=int, default=settings.CHUNK_OVERLAP)
     parser.add_argument("--model", default=settings.MODEL_NAME)
     parser.add_argument("--index_dir", default=settings.INDEX_DIR)
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for PDF extraction (default: all cores)")
+    parser.add_argument("--append", action="store_true", help="Add the PDF to the existing index instead of replacing it")
     args = parser.parse_args()
 
     pdf_path = Path(args.pdf)
     assert pdf_path.exists(), f"PDF not found: {pdf_path}"
 
-    pages = read_pdf_with_pages(pdf_path)
-    if not pages:
+    corpus = build_corpus_from_pdf(pdf_path, args.chunk_size, args.overlap, jobs=args.jobs)
+    if not corpus:
         raise ValueError("No extractable text found in PDF.")
 
-    corpus = build_corpus(pages, args.chunk_size, args.overlap)
     embeddings = embed_corpus(corpus, args.model)
 
     index_dir = Path(args.index_dir)
-    save_index_and_store(embeddings, corpus, index_dir / "index.faiss", index_dir / "store.json")
+    manifest_path = index_dir / "manifest.json"
+    fingerprint = index_fingerprint(pdf_path, args.chunk_size, args.overlap, args.model)
+    docs = read_manifest(manifest_path) if args.append else []
+    replace = not (args.append and can_append(fingerprint, docs))
+    if replace:
+        docs = []
+    manifest_path.unlink(missing_ok=True)  # stale until the new index is fully written
+    save_index_and_store(embeddings, corpus, index_dir / "index.faiss", index_dir / "store.json", replace=replace)
+    write_manifest(docs + [fingerprint], manifest_path)
 
     print(f"[OK] Ingested {len(corpus)} chunks from {pdf_path.name}")
     print(f"[OK] Saved index to {index_dir/'index.faiss'} and store to {index_dir/'store.json'}")
@@ -1,50 +1,336 @@
-import requests
+import asyncio
+import hashlib
+import json
 import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import diskcache
+import faiss
+import httpx
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import settings
+from .store import replace_file
 
 HYPERBOLIC_URL = "https://api.hyperbolic.xyz/v1/chat/completions"
 HYPERBOLIC_API_KEY = os.getenv("HYPERBOLIC_API_KEY")
+# 👉 Try with a valid model name from Hyperbolic docs
+HYPERBOLIC_MODEL = "openai/gpt-oss-20b"
 
-def call_llm(question: str, snippets: list[dict]) -> str:
-    if not HYPERBOLIC_API_KEY:
-        raise RuntimeError("Set HYPERBOLIC_API_KEY in your .env file.")
 
-    # Build context from retrieved snippets
-    context_text = "\n\n".join([f"(Page {s['page']}) {s['text']}" for s in snippets])
-    prompt = f"""
+class ResponseCache:
+    """
+    Exact-match cache for LLM answers.
+    In-memory LRU in front of an optional on-disk store (survives restarts).
+    """
+    def __init__(self, maxsize: int = 512, disk_dir: Path | None = None):
+        self.maxsize = maxsize
+        self._lru: OrderedDict[str, str] = OrderedDict()
+        # Lookups run on several worker threads; get's check + move_to_end must not race an eviction
+        self._lock = threading.Lock()
+        self.disk_dir = disk_dir
+        self._disk_cache: diskcache.Cache | None = None
+        self.hits = 0
+        self.misses = 0
+        self.semantic_hits = 0  # exact misses answered by the semantic cache
+
+    @property
+    def _disk(self) -> diskcache.Cache | None:
+        # Opened lazily so importing this module doesn't touch INDEX_DIR
+        if self._disk_cache is None and self.disk_dir:
+            self._disk_cache = diskcache.Cache(str(self.disk_dir))
+        return self._disk_cache
+
+    @staticmethod
+    def make_key(payload: dict) -> str:
+        blob = json.dumps(
+            {"model": payload["model"], "messages": payload["messages"], "temperature": payload["temperature"]},
+            sort_keys=True,
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, count_miss: bool = True) -> str | None:
+        """
+        Cached answer for key, or None.
+        count_miss=False leaves a miss uncounted, for callers that record the outcome
+        themselves with record_fallback() once another lookup has been tried.
+        """
+        with self._lock:
+            answer = self._lru.get(key)
+            if answer is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return answer
+        # diskcache is safe across threads and processes, no need to hold the lock for it
+        answer = self._disk.get(key) if self._disk is not None else None
+        with self._lock:
+            if answer is None:
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._remember(key, answer)
+            self.hits += 1
+            return answer
+
+    def put(self, key: str, answer: str) -> None:
+        with self._lock:
+            self._remember(key, answer)
+        if self._disk is not None:
+            self._disk.set(key, answer)
+
+    def _remember(self, key: str, answer: str) -> None:
+        # Caller holds self._lock
+        self._lru[key] = answer
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def record_fallback(self, semantic_hit: bool) -> None:
+        """Count an exact miss (get(count_miss=False)) by how the semantic cache did."""
+        with self._lock:
+            if semantic_hit:
+                self.semantic_hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits, "semantic_hits": self.semantic_hits, "misses": self.misses, "size": len(self._lru)
+            }
+
+
+response_cache = ResponseCache(
+    maxsize=settings.LLM_CACHE_SIZE,
+    disk_dir=Path(settings.INDEX_DIR) / "llm_cache" if settings.LLM_DISK_CACHE else None,
+)
+
+
+class SemanticLLMCache:
+    """
+    Reuses answers for paraphrased questions.
+    Questions are embedded with the retriever's model and kept in a small FAISS index;
+    a hit needs cosine >= threshold and at least one (doc_id, page) in common with the current snippets.
+    Persisted as an append-only JSON-lines log (embedding, pages, answer per line):
+    adding an answer appends one line, and the index is rebuilt from the log on load.
+    """
+    def __init__(self, model, path: Path = None, threshold: float = None):
+        self.model = model
+        self.path = path or settings.sem_cache_path
+        self.threshold = settings.SEM_CACHE_THRESHOLD if threshold is None else threshold
+
+        # Shared between request threads; FAISS add/search aren't safe to interleave
+        self._lock = threading.Lock()
+        # Set by close(): requests still holding this object must not write to the log
+        self._closed = False
+
+        dim = model.get_sentence_embedding_dimension()
+        self.index = faiss.IndexFlatIP(dim)
+        self.entries: list[dict] = []
+        self._load(dim)
+
+    def _load(self, dim: int) -> None:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except (OSError, UnicodeDecodeError):
+            return  # missing or unreadable: start empty
+
+        kept, embs = [], []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                emb, answer = entry["emb"], entry["answer"]
+                pages = [(str(doc_id), int(page)) for doc_id, page in entry["pages"]]
+            except (ValueError, KeyError, TypeError):
+                continue  # e.g. a line cut short by a crash mid-append, or bare page numbers
+            # Skip entries written by a different embedding model
+            if len(emb) != dim:
+                continue
+            kept.append(line)
+            embs.append(emb)
+            self.entries.append({"pages": pages, "answer": answer})
+        if embs:
+            self.index.add(np.asarray(embs, dtype=np.float32))
+        if len(kept) != len(lines) or (lines and not lines[-1].endswith("\n")):
+            # Drop the bad lines so the next append doesn't land on a torn one
+            replace_file(self.path, lambda p: p.write_text("".join(l.rstrip("\n") + "\n" for l in kept), encoding="utf-8"))
+
+    def embed(self, question: str) -> np.ndarray:
+        q = " ".join(question.lower().split())
+        return self.model.encode([q], convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, q_emb: np.ndarray, pages: set[tuple[str, int]], k: int = 4) -> str | None:
+        with self._lock:
+            if self._closed or self.index.ntotal == 0:
+                return None
+            scores, idxs = self.index.search(q_emb, min(k, self.index.ntotal))
+            # Read entries under the lock too: close() empties them
+            candidates = [(self.entries[i], score) for i, score in zip(idxs[0].tolist(), scores[0].tolist())]
+        for entry, score in candidates:
+            if score < self.threshold:
+                break
+            if pages & set(entry["pages"]):
+                return entry["answer"]
+        return None
+
+    def add(self, q_emb: np.ndarray, pages: set[tuple[str, int]], answer: str) -> None:
+        entry = {"pages": sorted(pages), "answer": answer}
+        line = json.dumps({"emb": q_emb[0].tolist(), **entry}, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._closed:
+                return  # answer is about an index that has since been replaced
+            self.index.add(q_emb)
+            self.entries.append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+
+    def close(self) -> None:
+        """Retire this cache: from now on lookups miss and add() writes nothing."""
+        with self._lock:
+            self._closed = True
+            self.index.reset()
+            self.entries = []
+
+
+_SYSTEM_MSG = {"role": "system", "content": "You are a helpful assistant."}
+_PROMPT_TMPL = """
 You are a financial policy assistant.
 Use the context below to answer the user's question.
 Always cite page numbers when relevant.
 
 Context:
-{context_text}
+{context}
 
 Question: {question}
 Answer:
     """
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {HYPERBOLIC_API_KEY}"
-    }
 
-    payload = {
-        # 👉 Try with a valid model name from Hyperbolic docs
-        "model": "openai/gpt-oss-20b",  
+def _build_payload(question: str, snippets: list[dict]) -> dict:
+    # Build context from retrieved snippets
+    context_text = "\n\n".join([f"(Page {s['page']}) {s['text']}" for s in snippets])
+    prompt = _PROMPT_TMPL.format(context=context_text, question=question.strip())
+
+    return {
+        "model": HYPERBOLIC_MODEL,
         "messages": [
-            {"role": "system", "content": "You are a helpful assistant."},
+            _SYSTEM_MSG,
             {"role": "user", "content": prompt}
         ],
         "max_tokens": 512,
-        "temperature": 0.7,
+        "temperature": 0.0,  # deterministic answers, so they can be cached
         "top_p": 0.8,  # some APIs require this
         "stream": False      # disable streaming unless supported
     }
 
-    resp = requests.post(HYPERBOLIC_URL, headers=headers, json=payload)
+
+def _lookup_cached(payload: dict, question: str, snippets: list[dict], sem_cache: SemanticLLMCache | None):
+    """
+    Check the exact and semantic caches.
+    Returns (answer, remember): answer is None on a miss, remember(answer) stores a fresh one.
+    """
+    # Sampling at temperature > 0 is not reproducible, so only cache greedy answers
+    if payload["temperature"] != 0:
+        return None, lambda answer: None
+
+    key = ResponseCache.make_key(payload)
+    cached = response_cache.get(key, count_miss=sem_cache is None)
+    if cached is not None:
+        return cached, None
+
+    # Page numbers alone are ambiguous once the index holds several documents
+    pages = {(s.get("doc_id", ""), s["page"]) for s in snippets}
+    q_emb = None
+    if sem_cache is not None:
+        q_emb = sem_cache.embed(question)
+        cached = sem_cache.lookup(q_emb, pages)
+        response_cache.record_fallback(semantic_hit=cached is not None)
+        if cached is not None:
+            response_cache.put(key, cached)
+            return cached, None
+
+    def remember(answer: str) -> None:
+        response_cache.put(key, answer)
+        if sem_cache is not None:
+            sem_cache.add(q_emb, pages, answer)
+
+    return None, remember
+
+
+def _headers() -> dict:
+    if not HYPERBOLIC_API_KEY:
+        raise RuntimeError("Set HYPERBOLIC_API_KEY in your .env file.")
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {HYPERBOLIC_API_KEY}"
+    }
+
+
+# Pooled keep-alive connections: reuse the TLS session across calls
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2),
+))
+
+
+def call_llm(question: str, snippets: list[dict], sem_cache: SemanticLLMCache | None = None) -> str:
+    headers = _headers()
+    payload = _build_payload(question, snippets)
+    cached, remember = _lookup_cached(payload, question, snippets, sem_cache)
+    if cached is not None:
+        return cached
+
+    resp = _session.post(HYPERBOLIC_URL, headers=headers, json=payload, timeout=(3.05, 60))
     try:
         resp.raise_for_status()
     except requests.HTTPError as e:
         raise RuntimeError(f"Hyperbolic API error {resp.status_code}: {resp.text}") from e
 
     data = resp.json()
-    return data["choices"][0]["message"]["content"]
+    answer = data["choices"][0]["message"]["content"]
+    remember(answer)
+    return answer
+
+
+# Shared async client: HTTP/2 multiplexes concurrent calls over one keep-alive connection,
+# so concurrent /ask requests already share it without any client-side batching
+async_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+
+
+async def _post_async(payload: dict) -> str:
+    resp = await async_client.post(HYPERBOLIC_URL, headers=_headers(), json=payload)
+    try:
+        resp.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        raise RuntimeError(f"Hyperbolic API error {resp.status_code}: {resp.text}") from e
+    return resp.json()["choices"][0]["message"]["content"]
+
+
+async def call_llm_async(question: str, snippets: list[dict], sem_cache: SemanticLLMCache | None = None) -> str:
+    _headers()
+    payload = _build_payload(question, snippets)
+    # Cache lookups may embed the question, keep that off the event loop
+    cached, remember = await asyncio.to_thread(_lookup_cached, payload, question, snippets, sem_cache)
+    if cached is not None:
+        return cached
+
+    answer = await _post_async(payload)
+    await asyncio.to_thread(remember, answer)
+    return answer
+
+
+async def close_async_client() -> None:
+    await async_client.aclose()
@@ -2,9 +2,14 @@
 Minimal conversation memory for follow-ups.
 Keeps last topic and last user question per session.
 """
+import re
 from dataclasses import dataclass, field
 from typing import Dict, List
 
+_PRONOUN_RE = re.compile(r"\b(?:it|that|they|this|those|them|there|here)\b", re.I)
+# Prefix match so plurals/derivations ("taxes", "budgetary") still count
+_KW_RE = re.compile(r"\b(?:budget|debt|infrastructure|tax|revenue|expenditure|loan|deficit|grant|policy)", re.I)
+
 
 @dataclass
 class SessionState:
@@ -35,9 +40,8 @@ class ConversationMemory:
         """
         s = self._get(session_id)
         q = user_question.strip()
-        tokens = q.lower().split()
-        pronouns = {"it", "that", "they", "this", "those", "them", "there", "here"}
-        if len(tokens) <= 5 or any(t in pronouns for t in tokens):
+        # <= 5 words, or any pronoun
+        if q.count(" ") <= 4 or _PRONOUN_RE.search(q):
             if s.last_topic:
                 q = f"{q} (context: {s.last_topic})"
         return q
@@ -46,10 +50,8 @@ class ConversationMemory:
         """
         Very naive topic guess: pick frequent policy keywords.
         """
-        kws = ["budget", "debt", "infrastructure", "tax", "revenue", "expenditure", "loan", "deficit", "grant", "policy"]
-        ql = user_question.lower()
-        for k in kws:
-            if k in ql:
-                return k
+        m = _KW_RE.search(user_question)
+        if m:
+            return m.group(0).lower()
         # default: first 3 informative words
-        return " ".join([w for w in ql.split() if len(w) > 3][:3])
\ No newline at end of file
+        return " ".join([w for w in user_question.lower().split() if len(w) > 3][:3])
\ No newline at end of file
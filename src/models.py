@@ -0,0 +1,33 @@
+"""
+Shared sentence-embedding model.
+Ingest, retrieval and the semantic LLM cache all use one in-memory copy per model name.
+"""
+from functools import lru_cache
+
+import torch
+from sentence_transformers import SentenceTransformer
+
+from .config import settings
+
+
+def embed_precision() -> str:
+    """Numeric precision get_model runs the encoder at on this host (embeddings differ slightly)."""
+    if torch.cuda.is_available():
+        return "fp16"
+    return "int8" if settings.EMBED_INT8 else "fp32"
+
+
+@lru_cache(maxsize=2)
+def get_model(model_name: str) -> SentenceTransformer:
+    """
+    Load the sentence encoder: fp16 on GPU when CUDA is available,
+    otherwise (optionally) with int8 dynamically quantized Linear layers.
+    """
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(model_name, device=device)
+    precision = embed_precision()
+    if precision == "fp16":
+        model.half()
+    elif precision == "int8":
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
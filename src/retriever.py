@@ -1,15 +1,41 @@
 """
 Thin wrapper around FAISS + metadata store.
 """
+from functools import lru_cache
 from typing import List, Dict
-import json
 from pathlib import Path
 
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
 
 from .config import settings
+from .models import get_model
+from .store import CorpusStore, USE_MMAP
+
+
+def _to_gpu(index: faiss.Index) -> faiss.Index:
+    """
+    Move the index to GPU 0 when running on a faiss-gpu build with a CUDA device.
+    Flat scalar-quantized indexes have no GPU version: their vectors are decoded
+    into a flat index held in fp16 on the GPU. HNSW stays on the CPU (SIMD) kernels.
+    """
+    if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+        return index
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        flat = faiss.IndexFlat(index.d, index.metric_type)
+        flat.add(index.reconstruct_n(0, index.ntotal))
+        co = faiss.GpuClonerOptions()
+        co.useFloat16 = True
+        return faiss.index_cpu_to_gpu(_gpu_resources(), 0, flat, co)
+    if not isinstance(index, (faiss.IndexFlat, faiss.IndexIVF)):
+        return index
+    return faiss.index_cpu_to_gpu(_gpu_resources(), 0, index)
+
+
+@lru_cache(maxsize=1)
+def _gpu_resources():
+    # Shared scratch memory; must outlive every GPU index built from it
+    return faiss.StandardGpuResources()
 
 
 class Retriever:
@@ -21,29 +47,48 @@ class Retriever:
         assert self.index_path.exists(), f"FAISS index not found at {self.index_path}"
         assert self.store_path.exists(), f"Store not found at {self.store_path}"
 
-        self.index = faiss.read_index(str(self.index_path))
-        with self.store_path.open("r", encoding="utf-8") as f:
-            self.store = json.load(f)
+        self.reload()
+        self.model = get_model(self.model_name)
+
+    def reload(self) -> None:
+        """Re-read the index and store from disk, keeping the loaded model."""
+        # Memory-mapped: pages come from the OS page cache, shared by all workers.
+        # MMAP_IFC maps the vector codes of flat/SQ/HNSW indexes (IO_FLAG_MMAP alone
+        # still copies them into process memory) and also covers IVF-PQ lists.
+        io_flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if USE_MMAP else 0
+        index = faiss.read_index(str(self.index_path), io_flags)
+        store = CorpusStore(self.store_path)
+        # efSearch (HNSW) / nprobe (IVF) chosen at ingest time
+        params = faiss.ParameterSpace()
+        for name, value in store.search_params.items():
+            params.set_index_parameter(index, name, value)
+        # GPU copies keep nprobe from the CPU index
+        index = _to_gpu(index)
+        # One attribute, so the swap is a single assignment and a concurrent
+        # search never sees the new index with the old store
+        self._loaded = (index, store)
+
+    @property
+    def index(self) -> faiss.Index:
+        return self._loaded[0]
 
-        self.model = SentenceTransformer(self.model_name)
+    @property
+    def store(self) -> CorpusStore:
+        return self._loaded[1]
 
     def search(self, query: str, top_k: int = None) -> List[Dict]:
         top_k = top_k or settings.TOP_K
+        # reload() may swap these from another thread mid-search; row ids are only
+        # valid against the store they were built with
+        index, store = self._loaded
         q_emb = self.model.encode([query], convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
-        scores, idxs = self.index.search(q_emb, top_k)
+        scores, idxs = index.search(q_emb, top_k)
         idxs = idxs[0].tolist()
         scores = scores[0].tolist()
 
-        corpus = self.store["corpus"]
         results = []
         for i, score in zip(idxs, scores):
             if i == -1:
                 continue
-            item = corpus[i]
-            results.append({
-                "score": float(score),
-                "page": item["page"],
-                "chunk_id": item["chunk_id"],
-                "text": item["text"]
-            })
+            results.append({"score": float(score), **store.get(i)})
         return results
\ No newline at end of file
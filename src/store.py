@@ -0,0 +1,138 @@
+"""
+Chunk metadata store, kept column-wise next to the FAISS index.
+
+Files (all in the store's directory):
+- store.json      small header: row count + index search params
+- pages.npy       int32 page number per chunk
+- chunk_ids.npy   chunk id per chunk
+- doc_ids.npy     source document per chunk
+- texts.parquet   whitespace-normalized chunk text per chunk
+"""
+import json
+import os
+from pathlib import Path
+from typing import Callable, List, Dict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PAGES_FILE = "pages.npy"
+CHUNK_IDS_FILE = "chunk_ids.npy"
+DOC_IDS_FILE = "doc_ids.npy"
+TEXTS_FILE = "texts.parquet"
+# Bump when the on-disk layout changes so existing indexes get rebuilt
+STORE_FORMAT = 3
+# Windows refuses to replace a file that is memory-mapped, which would make every
+# re-ingest fail while a Retriever is loaded; read files into memory there instead
+USE_MMAP = os.name != "nt"
+
+
+def replace_file(path: Path, write) -> None:
+    """
+    Write via a temp file + rename. Readers that memory-mapped the old file
+    keep their (unlinked) copy instead of seeing it truncated underneath them.
+    """
+    replace_files({path: write})
+
+
+def replace_files(writes: Dict[Path, Callable[[Path], None]]) -> None:
+    """
+    replace_file for files that must change together: every temp file is written
+    before any is renamed, so a failed write leaves all of them as they were.
+    """
+    tmps = {path: path.with_name(path.name + ".tmp") for path in writes}
+    try:
+        for path, write in writes.items():
+            write(tmps[path])
+    except BaseException:
+        for tmp in tmps.values():
+            tmp.unlink(missing_ok=True)
+        raise
+    for path, tmp in tmps.items():
+        os.replace(tmp, path)
+
+
+def _save_npy(path: Path, arr: np.ndarray) -> None:
+    with path.open("wb") as f:
+        np.save(f, arr)
+
+
+def write_store(corpus: List[Dict], store_path: Path, search_params: Dict, append: bool = False) -> None:
+    """
+    Write the corpus as parallel arrays plus a JSON header at store_path.
+    With append=True the chunks are added after the ones already stored.
+    """
+    replace_files(store_writers(corpus, store_path, search_params, append))
+
+
+def store_writers(
+    corpus: List[Dict], store_path: Path, search_params: Dict, append: bool = False
+) -> Dict[Path, Callable[[Path], None]]:
+    """
+    The writes behind write_store, for callers that replace other files
+    (the index) in the same replace_files call. Reads the current store if appending.
+    """
+    store_dir = store_path.parent
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    pages = np.array([c["page"] for c in corpus], dtype=np.int32)
+    chunk_ids = np.array([c["chunk_id"] for c in corpus], dtype=np.str_)
+    doc_ids = np.array([c.get("doc_id", "") for c in corpus], dtype=np.str_)
+    # Only the cleaned text is served back; the raw text is just for embedding
+    texts = pa.table({"text_clean": [c["text_clean"] for c in corpus]})
+    if append:
+        pages = np.concatenate([np.load(store_dir / PAGES_FILE), pages])
+        chunk_ids = np.concatenate([np.load(store_dir / CHUNK_IDS_FILE), chunk_ids])
+        doc_ids = np.concatenate([np.load(store_dir / DOC_IDS_FILE), doc_ids])
+        texts = pa.concat_tables([pq.read_table(store_dir / TEXTS_FILE), texts])
+
+    header = {"size": len(pages), "search_params": search_params}
+    return {
+        store_dir / PAGES_FILE: lambda p: _save_npy(p, pages),
+        store_dir / CHUNK_IDS_FILE: lambda p: _save_npy(p, chunk_ids),
+        store_dir / DOC_IDS_FILE: lambda p: _save_npy(p, doc_ids),
+        store_dir / TEXTS_FILE: lambda p: pq.write_table(texts, p),
+        store_path: lambda p: p.write_text(json.dumps(header, indent=2), encoding="utf-8"),
+    }
+
+
+def read_header(store_path: Path) -> Dict:
+    with store_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class CorpusStore:
+    """Read side of write_store: array lookups by FAISS row id."""
+    def __init__(self, store_path: Path):
+        store_dir = store_path.parent
+        self.search_params: Dict = read_header(store_path).get("search_params", {})
+
+        mmap_mode = "r" if USE_MMAP else None
+        self.pages = np.load(store_dir / PAGES_FILE, mmap_mode=mmap_mode)
+        self.chunk_ids = np.load(store_dir / CHUNK_IDS_FILE, mmap_mode=mmap_mode)
+        self.doc_ids = np.load(store_dir / DOC_IDS_FILE, mmap_mode=mmap_mode)
+        self._texts: pa.ChunkedArray | None = None
+        if USE_MMAP:
+            # Mapped now (pins this version of the file), decoded on first search
+            self._texts_file = pa.memory_map(str(store_dir / TEXTS_FILE), "r")
+        else:
+            # No open handle may outlive the constructor, or it blocks the next replace
+            self._texts = pq.read_table(store_dir / TEXTS_FILE).column("text_clean")
+
+    @property
+    def texts(self) -> pa.ChunkedArray:
+        if self._texts is None:
+            self._texts = pq.read_table(self._texts_file).column("text_clean")
+        return self._texts
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def get(self, i: int) -> Dict:
+        return {
+            "page": int(self.pages[i]),
+            "chunk_id": str(self.chunk_ids[i]),
+            "doc_id": str(self.doc_ids[i]),
+            "text": self.texts[i].as_py(),
+        }
@@ -1,4 +1,6 @@
-from src.ingest import chunk_text
+import pytest
+
+from src.chunking import chunk_text
 
 def test_chunking():
     text = "abcdefghijklmnopqrstuvwxyz"
@@ -6,4 +8,15 @@ def test_chunking():
     # Expected starts: 0, 8, 16, 24
     assert chunks[0] == "abcdefghij"
     assert chunks[1].startswith("ijklmnop")
-    assert len(chunks) >= 3
\ No newline at end of file
+    assert len(chunks) >= 3
+
+def test_chunking_stops_at_end_of_text():
+    chunks = chunk_text("abcdefghijklmnopqrstuvwxyz", chunk_size=10, overlap=2)
+    # The last chunk reaches the end, no trailing overlap-only chunk
+    assert chunks == ["abcdefghij", "ijklmnopqr", "qrstuvwxyz"]
+    assert chunk_text("", chunk_size=10, overlap=2) == []
+
+
+def test_chunking_rejects_overlap_not_smaller_than_chunk():
+    with pytest.raises(ValueError):
+        chunk_text("abc", chunk_size=5, overlap=5)
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+import src.ingest as ingest
+from src.ingest import embed_corpus
+
+
+class _FakeModel:
+    """Encodes each text to a vector derived from its content, and records batch sizes."""
+    device = SimpleNamespace(type="cpu")
+
+    def __init__(self):
+        self.batches = []
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.batches.append(len(texts))
+        return np.array([[len(t), sum(map(ord, t)) % 997, t.count("a")] for t in texts], dtype=np.float32)
+
+
+def test_embeddings_stay_aligned_with_their_chunks(monkeypatch):
+    model = _FakeModel()
+    monkeypatch.setattr(ingest, "get_model", lambda name: model)
+    rng = np.random.default_rng(0)
+    # More texts than the CPU batch size (64), lengths shuffled so sorting reorders them
+    texts = ["".join(rng.choice(list("abcxyz"), size=n)) for n in rng.integers(1, 400, size=150)]
+
+    embeddings = embed_corpus([{"text": t} for t in texts], "fake")
+    assert max(model.batches) <= 64
+
+    expected = np.array([model.encode([t])[0] for t in texts])
+    np.testing.assert_array_equal(embeddings, expected)
@@ -0,0 +1,55 @@
+import faiss
+import numpy as np
+import pytest
+
+import src.ingest as ingest
+from src.ingest import build_index
+
+
+def _embeddings(n, d=16, seed=0):
+    x = np.random.default_rng(seed).standard_normal((n, d)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _finds_itself(index, search_params, x):
+    params = faiss.ParameterSpace()
+    for name, value in search_params.items():
+        params.set_index_parameter(index, name, value)
+    _, idxs = index.search(x[:20], 1)
+    return (idxs[:, 0] == np.arange(20)).all()
+
+
+@pytest.mark.parametrize("precision, expected", [
+    ("fp32", faiss.IndexFlatIP),
+    ("fp16", faiss.IndexScalarQuantizer),
+    ("int8", faiss.IndexScalarQuantizer),
+])
+def test_flat_tier(precision, expected):
+    x = _embeddings(200)
+    index, search_params = build_index(x, precision)
+    assert type(index) is expected
+    assert search_params == {}
+    assert _finds_itself(index, search_params, x)
+
+
+@pytest.mark.parametrize("precision, expected", [
+    ("fp32", faiss.IndexHNSWFlat),
+    ("fp16", faiss.IndexHNSWSQ),
+])
+def test_hnsw_tier(monkeypatch, precision, expected):
+    monkeypatch.setattr(ingest, "FLAT_MAX_CHUNKS", 100)
+    x = _embeddings(200)
+    index, search_params = build_index(x, precision)
+    assert type(index) is expected
+    assert search_params == {"efSearch": 64}
+    assert _finds_itself(index, search_params, x)
+
+
+def test_ivfpq_tier(monkeypatch):
+    monkeypatch.setattr(ingest, "FLAT_MAX_CHUNKS", 100)
+    monkeypatch.setattr(ingest, "HNSW_MAX_CHUNKS", 1000)
+    x = _embeddings(2048)  # IVF needs at least as many training points as lists (1024)
+    index, search_params = build_index(x, "fp16")  # PQ-compressed whatever the precision
+    assert type(index) is faiss.IndexIVFPQ
+    assert search_params == {"nprobe": 16}
+    assert _finds_itself(index, search_params, x)
@@ -0,0 +1,75 @@
+import src.llm as llm
+from src.llm import ResponseCache, SemanticLLMCache, _build_payload, _lookup_cached
+
+
+def test_response_cache_lru_and_stats():
+    cache = ResponseCache(maxsize=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "semantic_hits": 0, "misses": 1, "size": 2}
+
+
+def test_cache_key_is_stable():
+    snippets = [{"page": 1, "text": "Debt ceiling is 10%."}]
+    k1 = ResponseCache.make_key(_build_payload("What is the debt ceiling?", snippets))
+    k2 = ResponseCache.make_key(_build_payload("  What is the debt ceiling? ", snippets))
+    k3 = ResponseCache.make_key(_build_payload("What is the deficit?", snippets))
+    assert k1 == k2
+    assert k1 != k3
+
+
+class _FakeModel:
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, **kwargs):
+        import numpy as np
+        return np.array([[1.0, 0.0, 0.0, 0.0] if "debt" in t else [0.0, 1.0, 0.0, 0.0] for t in texts])
+
+
+def test_semantic_cache_survives_torn_log(tmp_path):
+    path = tmp_path / "sem.jsonl"
+    cache = SemanticLLMCache(_FakeModel(), path=path, threshold=0.9)
+    cache.add(cache.embed("What is the debt ceiling?"), {("a.pdf", 1)}, "10%")
+    # Simulate a crash halfway through appending a second entry
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"emb": [0.0, 1.0')
+
+    reloaded = SemanticLLMCache(_FakeModel(), path=path, threshold=0.9)
+    assert reloaded.lookup(reloaded.embed("debt ceiling?"), {("a.pdf", 1)}) == "10%"
+    assert reloaded.lookup(reloaded.embed("debt ceiling?"), {("a.pdf", 2)}) is None  # no shared page
+    assert reloaded.lookup(reloaded.embed("debt ceiling?"), {("b.pdf", 1)}) is None  # same page, other document
+    reloaded.add(reloaded.embed("deficit target"), {("a.pdf", 2)}, "3%")
+    assert len(SemanticLLMCache(_FakeModel(), path=path).entries) == 2
+
+
+def test_semantic_hits_are_not_counted_as_misses(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "response_cache", ResponseCache())
+    sem_cache = SemanticLLMCache(_FakeModel(), path=tmp_path / "sem.jsonl", threshold=0.9)
+    snippets = [{"doc_id": "a.pdf", "page": 1, "text": "Debt ceiling is 10%."}]
+
+    question = "What is the debt ceiling?"
+    answer, remember = _lookup_cached(_build_payload(question, snippets), question, snippets, sem_cache)
+    assert answer is None
+    remember("10%")
+    # Paraphrase: new prompt, so an exact miss, answered by the semantic cache
+    question = "Tell me the debt ceiling"
+    answer, _ = _lookup_cached(_build_payload(question, snippets), question, snippets, sem_cache)
+    assert answer == "10%"
+    assert llm.response_cache.stats() == {"hits": 0, "semantic_hits": 1, "misses": 1, "size": 2}
+
+
+def test_closed_semantic_cache_neither_answers_nor_writes(tmp_path):
+    path = tmp_path / "sem.jsonl"
+    cache = SemanticLLMCache(_FakeModel(), path=path, threshold=0.9)
+    q_emb = cache.embed("What is the debt ceiling?")
+    cache.add(q_emb, {("a.pdf", 1)}, "10%")
+    path.unlink()  # what _refresh_retriever does after closing it
+
+    cache.close()
+    assert cache.lookup(q_emb, {("a.pdf", 1)}) is None
+    cache.add(q_emb, {("a.pdf", 1)}, "stale")  # a request that was still in flight
+    assert not path.exists()
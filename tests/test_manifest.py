@@ -0,0 +1,77 @@
+import pytest
+
+from src.ingest import index_fingerprint, index_is_current, can_append, write_manifest
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    # Only existence of the index/store files matters here
+    (tmp_path / "index.faiss").write_bytes(b"")
+    (tmp_path / "store.json").write_text("{}")
+    return tmp_path
+
+
+def _fingerprint(tmp_path, name="policy.pdf", content=b"%PDF-1.4 policy"):
+    pdf = tmp_path / name
+    pdf.write_bytes(content)
+    return index_fingerprint(pdf, 1000, 200, "all-MiniLM-L6-v2")
+
+
+def _is_current(index_dir, fingerprint, replace):
+    return index_is_current(
+        fingerprint, index_dir / "manifest.json", index_dir / "index.faiss", index_dir / "store.json", replace
+    )
+
+
+def test_replace_is_current_only_for_exactly_this_pdf(index_dir):
+    fp = _fingerprint(index_dir)
+    other = _fingerprint(index_dir, "budget.pdf", b"%PDF-1.4 budget")
+
+    write_manifest([fp], index_dir / "manifest.json")
+    assert _is_current(index_dir, fp, replace=True)
+    assert not _is_current(index_dir, other, replace=True)
+
+    write_manifest([fp, other], index_dir / "manifest.json")
+    assert not _is_current(index_dir, fp, replace=True)  # replacing would drop budget.pdf
+
+
+def test_append_is_current_when_pdf_already_listed(index_dir):
+    fp = _fingerprint(index_dir)
+    other = _fingerprint(index_dir, "budget.pdf", b"%PDF-1.4 budget")
+    write_manifest([other, fp], index_dir / "manifest.json")
+    assert _is_current(index_dir, fp, replace=False)
+
+
+def test_missing_index_files_are_never_current(index_dir):
+    fp = _fingerprint(index_dir)
+    write_manifest([fp], index_dir / "manifest.json")
+    (index_dir / "index.faiss").unlink()
+    assert not _is_current(index_dir, fp, replace=True)
+
+
+def test_empty_or_missing_manifest_rebuilds(index_dir):
+    fp = _fingerprint(index_dir)
+    assert not _is_current(index_dir, fp, replace=False)
+    assert not can_append(fp, [])
+
+
+def test_append_needs_matching_build_settings(index_dir):
+    fp = _fingerprint(index_dir)
+    other = _fingerprint(index_dir, "budget.pdf", b"%PDF-1.4 budget")
+    assert can_append(fp, [other])
+    for field, value in [("embed_precision", "fp16" if fp["embed_precision"] != "fp16" else "fp32"),
+                         ("index_precision", "int8" if fp["index_precision"] != "int8" else "fp16"),
+                         ("model", "another-model"),
+                         ("store_format", fp["store_format"] - 1)]:
+        assert not can_append(fp, [{**other, field: value}]), field
+
+
+def test_append_of_a_changed_pdf_rebuilds(index_dir):
+    old = _fingerprint(index_dir)
+    other = _fingerprint(index_dir, "budget.pdf", b"%PDF-1.4 budget")
+    write_manifest([old, other], index_dir / "manifest.json")
+
+    edited = _fingerprint(index_dir, content=b"%PDF-1.4 policy, revised")
+    assert edited["doc_id"] == old["doc_id"]
+    assert not _is_current(index_dir, edited, replace=False)
+    assert not can_append(edited, [old, other])
@@ -0,0 +1,15 @@
+from src.memory import ConversationMemory
+
+
+def test_contextualize_appends_last_topic():
+    mem = ConversationMemory()
+    mem.update("s", "What is the debt ceiling?", "debt")
+    assert mem.contextualize("s", "And it?") == "And it? (context: debt)"
+    long_q = "Explain the total budget allocated for schools in the region"
+    assert mem.contextualize("s", long_q) == long_q
+
+
+def test_infer_topic():
+    mem = ConversationMemory()
+    assert mem.infer_topic("What about Taxes in 2025?") == "tax"
+    assert mem.infer_topic("syntax errors appear everywhere") == "syntax errors appear"
@@ -0,0 +1,58 @@
+import faiss
+import numpy as np
+import pytest
+
+import src.store as store_module
+from src.ingest import save_index_and_store
+from src.store import write_store, read_header, CorpusStore, DOC_IDS_FILE
+
+
+def test_store_roundtrip(tmp_path):
+    corpus = [
+        {"page": 1, "chunk_id": "p1_c0", "doc_id": "a.pdf", "text": "Budget\n overview", "text_clean": "Budget overview"},
+        {"page": 3, "chunk_id": "p3_c1", "doc_id": "a.pdf", "text": "Débt ceiling", "text_clean": "Débt ceiling"},
+    ]
+    store_path = tmp_path / "store.json"
+    write_store(corpus, store_path, {"efSearch": 64})
+
+    store = CorpusStore(store_path)
+    assert len(store) == 2
+    assert store.search_params == {"efSearch": 64}
+    assert store.get(0) == {"page": 1, "chunk_id": "p1_c0", "doc_id": "a.pdf", "text": "Budget overview"}
+    assert store.get(1)["text"] == "Débt ceiling"
+
+
+def test_store_append(tmp_path):
+    store_path = tmp_path / "store.json"
+    write_store([{"page": 1, "chunk_id": "p1_c0", "doc_id": "a.pdf", "text_clean": "first"}], store_path, {})
+    write_store([{"page": 2, "chunk_id": "p2_c0", "doc_id": "b.pdf", "text_clean": "second"}], store_path, {}, append=True)
+
+    store = CorpusStore(store_path)
+    assert len(store) == 2
+    assert store.get(0)["doc_id"] == "a.pdf"
+    assert store.get(1) == {"page": 2, "chunk_id": "p2_c0", "doc_id": "b.pdf", "text": "second"}
+
+
+def test_failed_append_leaves_index_and_store_untouched(tmp_path):
+    index_path, store_path = tmp_path / "index.faiss", tmp_path / "store.json"
+    corpus = [{"page": i, "chunk_id": f"p{i}_c0", "doc_id": "a.pdf", "text_clean": f"t{i}"} for i in range(2)]
+    emb = np.eye(2, 4, dtype=np.float32)
+    save_index_and_store(emb, corpus, index_path, store_path)
+
+    (tmp_path / DOC_IDS_FILE).unlink()  # e.g. a store from before doc ids were kept
+    with pytest.raises(FileNotFoundError):
+        save_index_and_store(emb, corpus, index_path, store_path, replace=False)
+
+    assert faiss.read_index(str(index_path)).ntotal == 2
+    assert read_header(store_path)["size"] == 2
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_store_without_mmap(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, "USE_MMAP", False)  # the Windows path
+    store_path = tmp_path / "store.json"
+    write_store([{"page": 4, "chunk_id": "p4_c0", "doc_id": "a.pdf", "text_clean": "loaded"}], store_path, {})
+
+    store = CorpusStore(store_path)
+    assert not isinstance(store.pages, np.memmap)
+    assert store.get(0) == {"page": 4, "chunk_id": "p4_c0", "doc_id": "a.pdf", "text": "loaded"}
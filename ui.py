@@ -1,3 +1,5 @@
+import time
+
 import requests
 import streamlit as st 
 
@@ -6,6 +8,8 @@ import streamlit as st
 # -----------------------------
 API_URL_UPLOAD = "http://127.0.0.1:8000/upload_pdf"
 API_URL_ASK = "http://127.0.0.1:8000/ask"
+API_URL_JOBS = "http://127.0.0.1:8000/jobs"
+JOB_TIMEOUT_S = 600  # max wait for an ingest job
 SESSION_ID = "ui"
 
 # -----------------------------
@@ -27,7 +31,26 @@ if uploaded_file is not None:
         resp = requests.post(API_URL_UPLOAD, files=files)
         
         if resp.status_code == 200:
-            st.success(f"✅ Document processed successfully!")
+            # Ingestion runs in the background; wait for the job to finish
+            job_id = resp.json()["job_id"]
+            deadline = time.monotonic() + JOB_TIMEOUT_S
+            while True:
+                job_resp = requests.get(f"{API_URL_JOBS}/{job_id}", timeout=10)
+                if job_resp.status_code != 200:
+                    # e.g. 404 once the server restarted and forgot the job
+                    job = {"status": "error", "error": job_resp.text}
+                    break
+                job = job_resp.json()
+                if job["status"] != "pending" or time.monotonic() >= deadline:
+                    break
+                time.sleep(0.5)
+
+            if job["status"] == "done":
+                st.success(f"✅ Document processed successfully!")
+            elif job["status"] == "pending":
+                st.error(f"❌ Processing is taking longer than {JOB_TIMEOUT_S}s, giving up waiting.")
+            else:
+                st.error(f"❌ Processing failed: {job['error']}")
         else:
             st.error(f"❌ Upload failed: {resp.text}")
 
@@ -61,7 +84,7 @@ if st.button("Ask", type="primary"):
                 with st.expander("View Sources"):
                     st.markdown("### Sources")
                     for r in data["results"]:
-                        snippet = r["text"].strip().replace("\n", " ")
+                        snippet = r["text"]
                         st.markdown(f"**Page {r['page']}** (Relevance: {r['score']:.3f})")
                         st.caption(snippet[:200] + "...")
                         st.divider()